@@ -7,15 +7,17 @@ BSD 3-Clause License
 Copyright (c) 2023, Ivan Munoz Gutierrez
 """
 from msp.user_input import parse_command_line_input
-from msp.msplotter import app_cli
-from msp.gui import app_gui
 
 
 def main():
     user_input = parse_command_line_input()
+    # Import the app after parsing the input, so options like --help do not
+    # load matplotlib, Biopython or tkinter. Only the selected app is loaded.
     if user_input.gui:
+        from msp.gui import app_gui
         app_gui()
     else:
+        from msp.msplotter import app_cli
         app_cli(user_input)
 
 
@@ -9,15 +9,86 @@ BSD 3-Clause License
 Copyright (c) 2023, Ivan Munoz Gutierrez
 """
 
+from functools import lru_cache
+
+from matplotlib.collections import PolyCollection
 import matplotlib.pyplot as plt
 import numpy as np
 
+# Arrow coordinates are only used for plotting, and Matplotlib renders them
+# with single precision.
+_COORDINATES_DTYPE = np.float32
+
+# Polygon topology of an arrow. Each row is one of the nine vertices and
+# holds the coefficients of (x1, x2, xh) for the x-values, where xh is the
+# base of the head, and of (y, tw, hw) for the y-values, where tw and hw are
+# the signed half tail and head widths. Vertices 0, 1, 7 and 8 make the tail
+# and vertices 2 to 6 make the head.
+_X_TEMPLATE = np.array([
+    [1, 0, 0],
+    [1, 0, 0],
+    [0, 0, 1],
+    [0, 0, 1],
+    [0, 1, 0],
+    [0, 0, 1],
+    [0, 0, 1],
+    [1, 0, 0],
+    [1, 0, 0],
+], dtype=float)
+_Y_TEMPLATE = np.array([
+    [1, 0, 0],
+    [1, 1, 0],
+    [1, 1, 0],
+    [1, 0, 1],
+    [1, 0, 0],
+    [1, 0, -1],
+    [1, -1, 0],
+    [1, -1, 0],
+    [1, 0, 0],
+], dtype=float)
+
 
 # TODO: Make a graphical represention of the meaning of the x and y values for
 #       plotting the arrows. Provide and extra document with the graphical
 #       representation.
 
 
+@lru_cache(maxsize=8)
+def _make_kernel(head_width, head_height, ratio_tail_head_width):
+    """Make a function that computes arrow coordinates for a fixed head.
+
+    All the arrows of a figure share the same head geometry, so the derived
+    widths are computed once here. The returned function takes `x1`, `x2`,
+    `y`, `direction` (1 for forward arrows and -1 for reverse arrows) and an
+    optional (2, 9) `out` array, and returns a (2, 9) array with the x-values
+    in the first row and the y-values in the second row. The reverse arrow is
+    the forward arrow with the head and y offsets flipped.
+    """
+    tw_half = head_width * ratio_tail_head_width * 0.5
+    hw_half = head_width * 0.5
+    # Signed half tail width and half head width per direction.
+    offsets = {1: (tw_half, hw_half), -1: (-tw_half, -hw_half)}
+
+    def kernel(x1, x2, y, direction, out=None):
+        tw, hw = offsets[direction]
+        # Head base. Clamping the head height to the total height collapses
+        # the tail of short arrows, that are drawn with only the head.
+        xh = x2 - direction * min(head_height, (x2 - x1) * direction)
+        # Same vertices as the rows of `_X_TEMPLATE` and `_Y_TEMPLATE`. For a
+        # single arrow filling the rows directly is faster than the products.
+        if out is None:
+            coordinates = np.empty((2, 9), dtype=_COORDINATES_DTYPE)
+        else:
+            coordinates = out
+        coordinates[0] = (x1, x1, xh, xh, x2, xh, xh, x1, x1)
+        coordinates[1] = (
+            y, y + tw, y + tw, y + hw, y, y - hw, y - tw, y - tw, y
+        )
+        return coordinates
+
+    return kernel
+
+
 class Arrow:
     """Make coordinates to represent an arrow horizontally.
 
@@ -51,115 +122,83 @@ class Arrow:
         self.head_height = head_height
         self.head_shoulder = (head_width - self.tail_width) / 2
 
-    def coordinates_arrow_forward(self):
-        """Get forward arrow shape coordinates horizontally."""
-        height = self.x2 - self.x1
-        # If total height is smaller or equal to the arrow's head hight plot
-        # only head
-        if height <= self.head_height:
-            x_1 = self.x1
-            x_2 = self.x1
-            x_3 = self.x2
-            x_4 = self.x1
-            x_5 = self.x1
-            y_1 = self.y
-            y_2 = self.y + (self.head_width * 0.5)
-            y_3 = self.y
-            y_4 = self.y - (self.head_width * 0.5)
-            y_5 = self.y
-            x_values = np.array([x_1, x_2, x_3, x_4, x_5])
-            y_values = np.array([y_1, y_2, y_3, y_4, y_5])
-            return (x_values, y_values)
-        # Tail x-values
-        x_1 = self.x1
-        x_2 = self.x1
-        # Head x-values
-        x_3 = self.x2 - self.head_height
-        x_4 = self.x2 - self.head_height
-        x_5 = self.x2
-        x_6 = self.x2 - self.head_height
-        x_7 = self.x2 - self.head_height
-        # Tail x-values
-        x_8 = self.x1
-        x_9 = self.x1
-        # Tail y-values
-        y_1 = self.y
-        y_2 = self.y + (self.tail_width * 0.5)
-        # Head y-values
-        y_3 = self.y + (self.tail_width * 0.5)
-        y_4 = self.y + (self.tail_width * 0.5) + self.head_shoulder
-        y_5 = self.y
-        y_6 = self.y - (self.tail_width * 0.5) - self.head_shoulder
-        y_7 = self.y - (self.tail_width * 0.5)
-        # Tail y-values
-        y_8 = self.y - (self.tail_width * 0.5)
-        y_9 = self.y
-        # make datapoints for plotting
-        x_values = np.array(
-            [x_1, x_2, x_3, x_4, x_5, x_6, x_7, x_8, x_9]
-        )
-        y_values = np.array(
-            [y_1, y_2, y_3, y_4, y_5, y_6, y_7, y_8, y_9]
+    def _coordinates_arrow(self, direction, out=None):
+        """Get arrow shape coordinates horizontally.
+
+        `direction` is 1 for forward arrows and -1 for reverse arrows.
+        Returns a (2, 9) array with the x-values in the first row and the
+        y-values in the second row. If a (2, 9) `out` array is provided, the
+        coordinates are written into it.
+        """
+        kernel = _make_kernel(
+            self.head_width, self.head_height, self.ratio_tail_head_width
         )
-        return (x_values, y_values)
+        return kernel(self.x1, self.x2, self.y, direction, out)
+
+    def coordinates_arrow_forward(self, out=None):
+        """Get forward arrow shape coordinates horizontally."""
+        return self._coordinates_arrow(1, out)
 
-    def coordinates_arrow_reverse(self):
+    def coordinates_arrow_reverse(self, out=None):
         """Get reverse arrow shape coordinates horizontally."""
-        height = self.x1 - self.x2
-        # If total height is smaller or equal to the arrow's head hight plot
-        # only head
-        if height <= self.head_height:
-            x_1 = self.x1
-            x_2 = self.x1
-            x_3 = self.x2
-            x_4 = self.x1
-            x_5 = self.x1
-            y_1 = self.y
-            y_2 = self.y - (self.head_width * 0.5)
-            y_3 = self.y
-            y_4 = self.y + (self.head_width * 0.5)
-            y_5 = self.y
-            x_values = np.array([x_1, x_2, x_3, x_4, x_5])
-            y_values = np.array([y_1, y_2, y_3, y_4, y_5])
-            return (x_values, y_values)
-        # Tail x-values
-        x_1 = self.x1
-        x_2 = self.x1
-        # Head x-values
-        x_3 = self.x2 + self.head_height
-        x_4 = self.x2 + self.head_height
-        x_5 = self.x2
-        x_6 = self.x2 + self.head_height
-        x_7 = self.x2 + self.head_height
-        # Tail x-values
-        x_8 = self.x1
-        x_9 = self.x1
-        # Tail y-values
-        y_1 = self.y
-        y_2 = self.y - (self.tail_width * 0.5)
-        # Head y-values
-        y_3 = self.y - (self.tail_width * 0.5)
-        y_4 = self.y - (self.tail_width * 0.5) - self.head_shoulder
-        y_5 = self.y
-        y_6 = self.y + (self.tail_width * 0.5) + self.head_shoulder
-        y_7 = self.y + (self.tail_width * 0.5)
-        # Tail y-values
-        y_8 = self.y + (self.tail_width * 0.5)
-        y_9 = self.y
-        # make datapoints for plotting
-        x_values = np.array(
-            [x_1, x_2, x_3, x_4, x_5, x_6, x_7, x_8, x_9]
-        )
-        y_values = np.array(
-            [y_1, y_2, y_3, y_4, y_5, y_6, y_7, y_8, y_9]
-        )
-        return (x_values, y_values)
+        return self._coordinates_arrow(-1, out)
+
+    def get_coordinates(self, out=None):
+        """Get arrow shape coordinates as a (2, 9) array.
 
-    def get_coordinates(self):
+        If a (2, 9) `out` array is provided, like a slice of a workspace for
+        several arrows, the coordinates are written into it.
+        """
         if self.x1 < self.x2:
-            return self.coordinates_arrow_forward()
+            return self.coordinates_arrow_forward(out)
         else:
-            return self.coordinates_arrow_reverse()
+            return self.coordinates_arrow_reverse(out)
+
+    @classmethod
+    def coordinates_batch(
+        cls, x1, x2, y, ratio_tail_head_width=0.5, head_width=2,
+        head_height=200, out=None,
+    ):
+        """Get coordinates of several arrows at once.
+
+        Parameters
+        ----------
+        x1 : array-like
+            Start positions in the x-axis.
+        x2 : array-like
+            End positions in the x-axis.
+        y : float or array-like
+            Positions in the y-axis.
+        ratio_tail_head_width, head_width, head_height
+            Same meaning as the `Arrow` attributes and shared by all arrows.
+        out : numpy array with shape (N, 2, 9), optional
+            Array to write the coordinates into.
+
+        Returns
+        -------
+        coordinates : numpy array with shape (N, 2, 9)
+            x-values and y-values of each arrow. Arrows with total height
+            smaller or equal to the head height are drawn with only the head.
+        """
+        x1 = np.asarray(x1, dtype=float)
+        x2 = np.asarray(x2, dtype=float)
+        y = np.broadcast_to(np.asarray(y, dtype=float), x1.shape)
+        tw_half = head_width * ratio_tail_head_width * 0.5
+        hw_half = head_width * 0.5
+        if out is None:
+            coordinates = np.empty((x1.size, 2, 9), dtype=_COORDINATES_DTYPE)
+        else:
+            coordinates = out
+        # 1 for forward arrows and -1 for reverse arrows.
+        direction = np.where(x1 < x2, 1.0, -1.0)
+        # Head base, with the head height clamped to the total height.
+        xh = x2 - direction * np.minimum(head_height, np.abs(x2 - x1))
+        tw = direction * tw_half
+        hw = direction * hw_half
+        # One (N, 3) @ (3, 9) product per axis.
+        coordinates[:, 0] = np.column_stack([x1, x2, xh]) @ _X_TEMPLATE.T
+        coordinates[:, 1] = np.column_stack([y, tw, hw]) @ _Y_TEMPLATE.T
+        return coordinates
 
 
 if __name__ == "__main__":
@@ -167,17 +206,16 @@ if __name__ == "__main__":
     # Example of usage #
     ####################
 
-    # Make arrow
-    arrow1 = Arrow(x1=750, x2=2000, y=10)
-    x_values, y_values = arrow1.get_coordinates()
-    plt.fill(x_values, y_values, 'b')
-
-    arrow2 = Arrow(x1=1250, x2=250, y=20)
-    x_values, y_values = arrow2.get_coordinates()
-    plt.fill(x_values, y_values, 'r')
-
-    arrow3 = Arrow(x1=550, x2=500, y=30)
-    x_values, y_values = arrow3.get_coordinates()
-    plt.fill(x_values, y_values, 'r')
+    # Make arrows
+    coordinates = Arrow.coordinates_batch(
+        x1=[750, 1250, 550], x2=[2000, 250, 500], y=[10, 20, 30]
+    )
+    # Plot all the arrows with a single collection of (x, y) vertices.
+    vertices = coordinates.transpose(0, 2, 1)
+    fig, ax = plt.subplots()
+    ax.add_collection(
+        PolyCollection(vertices, facecolors=['b', 'r', 'r'], linewidths=0)
+    )
+    ax.autoscale_view()
 
     plt.show()
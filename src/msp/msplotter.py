@@ -17,14 +17,17 @@ This file is part of MSPloter
 BSD 3-Clause License
 Copyright (c) 2023, Ivan Munoz Gutierrez
 """
+from concurrent.futures import ThreadPoolExecutor
 import os
 import sys
 from pathlib import Path
 from typing import Union
+from xml.etree import ElementTree
 from importlib import resources
 
 import matplotlib as mpl
 from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection, PolyCollection
 import matplotlib.colors as colors
 from matplotlib.colors import Colormap
 import matplotlib.patches as mpatches
@@ -33,7 +36,6 @@ from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 import matplotlib.ticker as ticker
 import numpy as np
 from Bio import SeqIO
-from Bio.Blast import NCBIXML
 from Bio.Blast.Applications import NcbiblastnCommandline
 from Bio.SeqRecord import SeqRecord
 
@@ -63,6 +65,18 @@ class GenBankRecord:
     sequence_end : int
         End coordinate used for plotting. Default value is zero but changes if
         `alignments_position` of `MakeFigure` class is set to center or left.
+    cds_genes : list
+        `gene` tag of each CDS.
+    cds_products : list
+        `product` tag of each CDS.
+    cds_starts : numpy array
+        Start coordinate of each CDS used for plotting.
+    cds_ends : numpy array
+        End coordinate of each CDS used for plotting.
+    cds_strands : numpy array
+        Strand of each CDS.
+    cds_colors : numpy array
+        Color of each CDS.
     cds : list
         List of `CodingSequence` classes with info of `CDS` tags as product,
         start, end, strand, and color.
@@ -75,7 +89,7 @@ class GenBankRecord:
         file_name : Path oject
             Path to file.
         """
-        record = SeqIO.read(file_name, 'genbank')
+        record = load_gb(file_name)
         self.file_name = file_name.stem
         self.name = record.name
         self.accession = record.id
@@ -83,22 +97,27 @@ class GenBankRecord:
         self.length = len(record)
         self.sequence_start = 0
         self.sequence_end = self.length
-        self.cds = self.parse_gb(record)
-        self.num_cds = len(self.cds)
+        self.parse_gb(record)
+        self.num_cds = len(self.cds_starts)
+
+    @property
+    def cds(self):
+        """List of `CodingSequence` classes, one per CDS."""
+        return [CodingSequence(self, i) for i in range(self.num_cds)]
 
     def parse_gb(self, record):
-        """Parse gb file and make a list of `CodingSequence` classes.
+        """Parse gb file and store the CDSs' information in arrays.
 
         Parameters
         ----------
         record : Bio SeqIO.read object.
-
-        Returns
-        -------
-        coding_sequences : list
-            List of `CodingSequence` classes holding CDSs' information.
         """
-        coding_sequences = []
+        genes = []
+        products = []
+        starts = []
+        ends = []
+        strands = []
+        cds_colors = []
         for feature in record.features:
             if feature.type != 'CDS':
                 continue
@@ -115,29 +134,81 @@ class GenBankRecord:
             # regulatory function (some transposase genes have frameshifts as
             # a regulatory function).
             for part in feature.location.parts:
-                strand = part._strand
-                if strand == -1:
-                    start = part._end
-                    end = part._start + 1
-                else:
-                    start = part._start + 1
-                    end = part._end
                 # Append cds.
-                coding_sequences.append(CodingSequence(
-                    gene, product, start, end, strand, color
-                ))
-        return coding_sequences
+                genes.append(gene)
+                products.append(product)
+                starts.append(int(part._start))
+                ends.append(int(part._end))
+                strands.append(int(part._strand))
+                cds_colors.append(color)
+        starts = np.array(starts, dtype=np.int64)
+        ends = np.array(ends, dtype=np.int64)
+        strands = np.array(strands, dtype=np.int64)
+        # Convert to 1-based coordinates. CDSs in the reverse strand start at
+        # the end of their location.
+        reverse = strands == -1
+        self.cds_starts = np.where(reverse, ends, starts + 1)
+        self.cds_ends = np.where(reverse, starts + 1, ends)
+        self.cds_strands = strands
+        self.cds_genes = genes
+        self.cds_products = products
+        self.cds_colors = np.array(cds_colors, dtype=object)
 
 
 class CodingSequence:
-    """Store Coding Sequence (CDS) information from gb file."""
-    def __init__(self, gene, product, start, end, strand, color):
-        self.gene = gene
-        self.product = product
-        self.start = int(start)
-        self.end = int(end)
-        self.strand = int(strand)
-        self.color = color
+    """Coding Sequence (CDS) information from gb file.
+
+    The information is read from the arrays of the `GenBankRecord` that has
+    the CDS. Therefore, position adjustments of the record are seen here.
+    """
+    __slots__ = ('gb_record', 'index')
+
+    def __init__(self, gb_record, index):
+        self.gb_record = gb_record
+        self.index = index
+
+    @property
+    def gene(self):
+        return self.gb_record.cds_genes[self.index]
+
+    @property
+    def product(self):
+        return self.gb_record.cds_products[self.index]
+
+    @property
+    def start(self):
+        return self.gb_record.cds_starts[self.index]
+
+    @property
+    def end(self):
+        return self.gb_record.cds_ends[self.index]
+
+    @property
+    def strand(self):
+        return self.gb_record.cds_strands[self.index]
+
+    @property
+    def color(self):
+        return self.gb_record.cds_colors[self.index]
+
+
+# Tags of the blastn xml results stored by `BlastnAlignment`, and the names
+# of the attributes that keep their values.
+_INFO_FIELDS = {
+    'Iteration_query-def': 'query_name',
+    'Iteration_query-len': 'query_len',
+    'Hit_def': 'hit_name',
+    'Hit_len': 'hit_len',
+}
+_HSP_FIELDS = {
+    'Hsp_query-from': 'query_from',
+    'Hsp_query-to': 'query_to',
+    'Hsp_hit-from': 'hit_from',
+    'Hsp_hit-to': 'hit_to',
+    'Hsp_identity': 'identity',
+    'Hsp_positive': 'positive',
+    'Hsp_align-len': 'align_len',
+}
 
 
 class BlastnAlignment:
@@ -153,66 +224,241 @@ class BlastnAlignment:
         Length of query sequence.
     hit_len : int
         Length of subject sequence.
+    query_from, query_to, hit_from, hit_to : numpy array
+        Coordinates of each aligned region used for plotting.
+    identity, positive, align_len : numpy array
+        Identities, positives and alignment length of each aligned region.
+    homologies : numpy array
+        Homology (identity / align_len) of each aligned region in float32.
+        It is only used to pick the colors of the regions. Values shown to
+        the user are computed from `identity` and `align_len` in float64.
     regions : list
         List of `RegionAlignmentResult` classes with info of aligned region as
         query_from, query_to, hit_from, hit_to, and identity.
+    num_regions : int
+        Number of aligned regions.
     """
 
     def __init__(self, xml_alignment_result):
-        with open(xml_alignment_result, 'r') as result_handle:
-            blast_record = NCBIXML.read(result_handle)
-            self.query_name = blast_record.query
-            self.hit_name = blast_record.alignments[0].hit_def
-            self.query_len = int(blast_record.query_length)
-            self.hit_len = int(blast_record.alignments[0].length)
-            self.regions = self.parse_blast_regions(blast_record)
+        self.parse_blast_xml(xml_alignment_result)
+        self.num_regions = len(self.query_from)
+        self.homologies = (
+            self.identity.astype(np.float32)
+            / self.align_len.astype(np.float32)
+        )
 
-    def parse_blast_regions(self, blast_record):
-        """Parse blastn aligned regions to store the information.
+    @property
+    def regions(self):
+        """List of `RegionAlignmentResult` classes, one per region."""
+        return [
+            RegionAlignmentResult(self, i) for i in range(self.num_regions)
+        ]
+
+    def parse_blast_xml(self, xml_alignment_result):
+        """Parse blastn results and store the aligned regions in arrays.
+
+        The xml file is read incrementally and only the first hit of the
+        query is parsed. Elements are cleared once read, so the aligned
+        sequences of the regions are never kept in memory.
 
         Parameters
         ----------
-        blast_record : NCBIXML object
-            Harbors blastn alignment results in xml format.
-
-        Returns
-        -------
-        regions : list
-            List of `RegionAlignmentResult` classes with info from alignment.
+        xml_alignment_result : Path
+            Path to the blastn alignment results in xml format.
         """
-        regions = []
-        for region in blast_record.alignments[0].hsps:
-            regions.append(RegionAlignmentResult(
-                query_from=int(region.query_start),
-                query_to=int(region.query_end),
-                hit_from=int(region.sbjct_start),
-                hit_to=int(region.sbjct_end),
-                identity=int(region.identities),
-                positive=int(region.positives),
-                align_len=int(region.align_length)
-            ))
-        return regions
+        info = {}
+        regions = {attribute: [] for attribute in _HSP_FIELDS.values()}
+        num_hsps = 0
+        with open(xml_alignment_result, 'rb') as result_handle:
+            for _, elem in ElementTree.iterparse(result_handle):
+                tag = elem.tag
+                if tag in _HSP_FIELDS:
+                    regions[_HSP_FIELDS[tag]].append(int(elem.text))
+                elif tag in _INFO_FIELDS:
+                    info.setdefault(_INFO_FIELDS[tag], elem.text)
+                elif tag == 'Hsp':
+                    # Each region must have exactly one value of each field,
+                    # otherwise the arrays would be shifted.
+                    num_hsps += 1
+                    if any(len(values) != num_hsps
+                           for values in regions.values()):
+                        sys.exit(
+                            f"Error: aligned region {num_hsps} in "
+                            f"`{xml_alignment_result}` does not have one "
+                            f"value of each of {', '.join(_HSP_FIELDS)}."
+                        )
+                elif tag == 'Hit':
+                    # Stop after the first hit.
+                    break
+                elem.clear()
+        if 'hit_name' not in info:
+            sys.exit(
+                f"Error: no alignment found in `{xml_alignment_result}`."
+            )
+        self.query_name = info['query_name']
+        self.hit_name = info['hit_name']
+        self.query_len = int(info['query_len'])
+        self.hit_len = int(info['hit_len'])
+        for attribute, values in regions.items():
+            setattr(self, attribute, np.array(values, dtype=np.int32))
 
 
 class RegionAlignmentResult:
-    """Save blastn results of region that aligned."""
-    def __init__(
-        self, query_from, query_to, hit_from, hit_to, identity, positive,
-        align_len
-    ):
-        self.query_from = query_from
-        self.query_to = query_to
-        self.hit_from = hit_from
-        self.hit_to = hit_to
-        self.identity = identity
-        self.positive = positive
-        self.align_len = align_len
-        self.homology = identity / align_len
+    """Blastn results of region that aligned.
+
+    The information is read from the arrays of the `BlastnAlignment` that has
+    the region. Therefore, position adjustments of the alignment are seen
+    here.
+    """
+    __slots__ = ('alignment', 'index')
+
+    def __init__(self, alignment, index):
+        self.alignment = alignment
+        self.index = index
+
+    @property
+    def query_from(self):
+        return self.alignment.query_from[self.index]
+
+    @property
+    def query_to(self):
+        return self.alignment.query_to[self.index]
+
+    @property
+    def hit_from(self):
+        return self.alignment.hit_from[self.index]
+
+    @property
+    def hit_to(self):
+        return self.alignment.hit_to[self.index]
+
+    @property
+    def identity(self):
+        return self.alignment.identity[self.index]
+
+    @property
+    def positive(self):
+        return self.alignment.positive[self.index]
+
+    @property
+    def align_len(self):
+        return self.alignment.align_len[self.index]
+
+    @property
+    def homology(self):
+        return float(self.identity / self.align_len)
+
+
+# Records parsed from GenBank files by absolute path, with the modification
+# time of the file when it was parsed. Only the most recently used files are
+# kept, so replotting the same files in the GUI does not parse them again.
+_GB_CACHE_SIZE = 16
+_gb_cache: dict[str, tuple[int, SeqRecord]] = {}
+
+
+def load_gb(gb_file: Path) -> SeqRecord:
+    """Parse a GenBank file, reusing the record if it was already parsed.
+
+    The file is parsed again if it was modified after it was cached, and the
+    new record replaces the old one.
+    """
+    path = str(Path(gb_file).resolve())
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _gb_cache.pop(path, None)
+    if cached is not None and cached[0] == mtime_ns:
+        record = cached[1]
+    else:
+        record = SeqIO.read(path, 'genbank')
+    # Store the record as the most recently used and drop the least recently
+    # used one if the cache is full.
+    _gb_cache[path] = (mtime_ns, record)
+    if len(_gb_cache) > _GB_CACHE_SIZE:
+        del _gb_cache[next(iter(_gb_cache))]
+    return record
+
+
+def read_gb_sequence(gb_file: Path) -> tuple[str, str, str]:
+    """Read the id, description and sequence of a GenBank file.
+
+    Only the header and the `ORIGIN` section are read, so the features are
+    never parsed. As in Biopython, the id is the `VERSION` (or `ACCESSION`,
+    or `LOCUS` name) and the description is the `DEFINITION` without the
+    final period.
+
+    Returns
+    -------
+    seq_id, description, sequence : tuple[str, str, str]
+    """
+    name = ''
+    accession = None
+    version = None
+    definition = []
+    sequence = []
+    with open(gb_file, 'r') as handle:
+        in_definition = False
+        for line in handle:
+            if line.startswith('ORIGIN'):
+                break
+            # The DEFINITION can continue in lines indented 12 spaces.
+            if in_definition and line.startswith(' ' * 12):
+                definition.append(line.strip())
+                continue
+            in_definition = False
+            fields = line.split()
+            if line.startswith('LOCUS') and len(fields) > 1:
+                name = fields[1]
+            elif line.startswith('DEFINITION'):
+                definition.append(line[10:].strip())
+                in_definition = True
+            elif line.startswith('ACCESSION') and len(fields) > 1:
+                accession = fields[1]
+            elif line.startswith('VERSION') and len(fields) > 1:
+                version = fields[1]
+        # Sequence lines start with the position of the first base.
+        for line in handle:
+            if line.startswith('//'):
+                break
+            sequence.extend(line.split()[1:])
+    # Records without sequence, like CONTIG records, cannot be aligned.
+    if not sequence:
+        sys.exit(
+            f"Error: the GenBank file `{gb_file}` has no sequence in an "
+            "`ORIGIN` section."
+        )
+    seq_id = version or accession or name
+    description = ' '.join(definition)
+    if description.endswith('.'):
+        description = description[:-1]
+    return (seq_id, description, ''.join(sequence).upper())
+
+
+def _make_one_fasta(gb_file: Path, output_path: Path) -> Path:
+    """Make a fasta file from a GenBank file and return its path."""
+    # Read sequence from gb file without parsing the features.
+    seq_id, description, sequence = read_gb_sequence(gb_file)
+    # Get name of gb file without extension
+    name = gb_file.name.split('.')[0]
+    faa_name = name + '.faa'
+    # Make otuput path
+    output_file = output_path / faa_name
+    # Create fasta file with lines of 60 bases.
+    with open(output_file, 'w') as handle:
+        if description:
+            handle.write(f'>{seq_id} {description}\n')
+        else:
+            handle.write(f'>{seq_id}\n')
+        for i in range(0, len(sequence), 60):
+            handle.write(sequence[i:i + 60])
+            handle.write('\n')
+    return output_file
 
 
 def make_fasta_files(gb_files: list[Path], output_path: Path) -> list[Path]:
     """Make fasta files from GenBank files.
 
+    Each file is read and written independently, so the files are processed
+    in a pool of threads that overlap the disk reads and writes.
+
     Parameters
     ----------
     gb_files : list[Path]
@@ -225,32 +471,40 @@ def make_fasta_files(gb_files: list[Path], output_path: Path) -> list[Path]:
     faa_files : list[Path]
         Paths' list of fasta files names.
     """
-    # Initiate list to store paths to fasta files.
-    faa_files = []
-    # Iterate over paths of gb files.
-    for gb_file in gb_files:
-        # Read gb files and make a new record
-        record = SeqIO.read(gb_file, "genbank")
-        new_record = SeqRecord(
-            record.seq,
-            id=record.id,
-            description=record.description
-        )
-        # Get name of gb file without extension
-        name = gb_file.name.split('.')[0]
-        faa_name = name + '.faa'
-        # Make otuput path
-        output_file = output_path / faa_name
-        # Create fasta file
-        SeqIO.write(new_record, output_file, 'fasta')
-        # Append path of fasta file to faa_files list.
-        faa_files.append(output_file)
+    if not gb_files:
+        return []
+    # Make fasta files. `map` gives the paths in the same order as the files.
+    max_workers = min(len(gb_files), 8)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        faa_files = list(executor.map(
+            _make_one_fasta, gb_files, [output_path] * len(gb_files)
+        ))
     return faa_files
 
 
+def _run_blastn_pair(query: Path, subject: Path, output_file: Path) -> tuple:
+    """Run blastn locally for one query and subject and create xml file.
+
+    Returns
+    -------
+    stdout, stderr : tuple[str, str]
+        Output of blastn.
+    """
+    blastn_cline = NcbiblastnCommandline(
+        query=query,
+        subject=subject,
+        outfmt=5,
+        out=output_file)
+    return blastn_cline()
+
+
 def run_blastn(faa_files: list[Path], output_path: Path) -> list[Path]:
     """Run blastn locally and create xml result file(s).
 
+    Each pair of consecutive fasta files is an independent blastn job, so the
+    jobs run at the same time in a pool of threads that wait for the blastn
+    processes.
+
     Parameters
     ----------
     faa_files : list[Path]
@@ -263,26 +517,23 @@ def run_blastn(faa_files: list[Path], output_path: Path) -> list[Path]:
     results : list[Path]
         Paths' list of xml files with blastn results.
     """
-    # Initiate list to store paths to xml results.
-    results = []
-    # Iterate over paths of fasta files.
-    for i in range(len(faa_files) - 1):
-        # Make path to outpu file
-        output_file_name = 'result' + str(i) + '.xml'
-        output_file = output_path / output_file_name
-        # Run blastn
-        blastn_cline = NcbiblastnCommandline(
-            query=faa_files[i],
-            subject=faa_files[i+1],
-            outfmt=5,
-            out=output_file)
-        stdout, stderr = blastn_cline()
-        # Append path to xlm results to the result list
-        results.append(output_file)
-        print(
-            f'BLASTing {faa_files[i]} (query) and {faa_files[i+1]} (subject)\n'
-        )
-        print(stdout + '\n' + stderr)
+    queries = faa_files[:-1]
+    subjects = faa_files[1:]
+    # Make paths to output files.
+    results = [
+        output_path / ('result' + str(i) + '.xml') for i in range(len(queries))
+    ]
+    if not results:
+        return results
+    # Run blastn. `map` gives the outputs in the same order as the pairs.
+    max_workers = min(len(results), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outputs = executor.map(_run_blastn_pair, queries, subjects, results)
+        for query, subject, (stdout, stderr) in zip(
+            queries, subjects, outputs
+        ):
+            print(f'BLASTing {query} (query) and {subject} (subject)\n')
+            print(stdout + '\n' + stderr)
     return results
 
 
@@ -319,6 +570,15 @@ def get_gb_records(gb_files: list) -> list:
     return gb_records
 
 
+# Options of `MakeFigure.sequence_name` and the `GenBankRecord` attributes
+# used to annotate the sequences.
+_SEQUENCE_NAME_ATTRIBUTES = {
+    'accession': 'accession',
+    'name': 'name',
+    'fname': 'file_name',
+}
+
+
 class MakeFigure:
     """Store relevant variables to plot the figure.
 
@@ -436,14 +696,30 @@ class MakeFigure:
             max_val=self.color_map_range[1],
             n=100
         )
+        # Lookup table with the colors of the color map.
+        self._cmap_lut = self.color_map(np.arange(self.color_map.N))
         self.homology_padding = y_separation * homology_padding
-        self.size_longest_sequence = self.get_longest_sequence()
-        self.lowest_homology = int(
-            round(self.get_lowest_and_highest_homology()[0] * 100)
+        # Positions in the y-axis of the sequences, from top to bottom, and
+        # of the top of the homology regions between consecutive sequences.
+        self._y_records = np.arange(len(gb_records), 0, -1) * y_separation
+        self._y_alignments = (
+            np.arange(len(alignments) + 1, 1, -1) * y_separation
         )
-        self.highest_homology = int(
-            round(self.get_lowest_and_highest_homology()[1] * 100)
+        self.size_longest_sequence = self.get_longest_sequence()
+        # Readjust position of sequences and alignments to the right or
+        # center if requested. It is done once here, so plotting the figure
+        # again does not shift the positions twice.
+        if self.alignments_position == "right":
+            self.adjust_positions_sequences_right()
+            self.adjust_positions_alignments_right()
+        elif self.alignments_position == "center":
+            self.adjust_positions_sequences_center()
+            self.adjust_positions_alignments_center()
+        lowest_homology, highest_homology = (
+            self.get_lowest_and_highest_homology()
         )
+        self.lowest_homology = int(round(lowest_homology * 100))
+        self.highest_homology = int(round(highest_homology * 100))
         self.figure_name = figure_name
         self.figure_format = figure_format
         self.figure_width = figure_width
@@ -454,15 +730,17 @@ class MakeFigure:
 
     def get_lowest_and_highest_homology(self) -> tuple:
         """Get the lowest and highest homologies in the alignment."""
-        lowest = 100
-        highest = 0
-        for alignment in self.alignments:
-            for region in alignment.regions:
-                if region.homology < lowest:
-                    lowest = region.homology
-                if region.homology > highest:
-                    highest = region.homology
-        return (lowest, highest)
+        if not self.alignments:
+            return (100, 0)
+        # The float64 ratios are used, as the float32 `homologies` can round
+        # the percentages of the colorbar differently.
+        homologies = np.concatenate([
+            alignment.identity / alignment.align_len
+            for alignment in self.alignments
+        ])
+        if homologies.size == 0:
+            return (100, 0)
+        return (float(homologies.min()), float(homologies.max()))
 
     def get_longest_sequence(self) -> int:
         """Find the longest sequence in gb_records."""
@@ -478,20 +756,18 @@ class MakeFigure:
             delta = self.size_longest_sequence - record.length
             record.sequence_start = record.sequence_start + delta
             record.sequence_end = record.sequence_end + delta
-            for sequence in record.cds:
-                sequence.start = sequence.start + delta
-                sequence.end = sequence.end + delta
+            record.cds_starts += delta
+            record.cds_ends += delta
 
     def adjust_positions_alignments_right(self) -> None:
         """Adjust position of alignments to the right."""
         for alignment in self.alignments:
             delta_query = self.size_longest_sequence - alignment.query_len
             delta_hit = self.size_longest_sequence - alignment.hit_len
-            for region in alignment.regions:
-                region.query_from = region.query_from + delta_query
-                region.query_to = region.query_to + delta_query
-                region.hit_from = region.hit_from + delta_hit
-                region.hit_to = region.hit_to + delta_hit
+            alignment.query_from += delta_query
+            alignment.query_to += delta_query
+            alignment.hit_from += delta_hit
+            alignment.hit_to += delta_hit
 
     def adjust_positions_sequences_center(self) -> None:
         """Adjust position of sequences to the center including CDSs."""
@@ -499,44 +775,42 @@ class MakeFigure:
             shift = (self.size_longest_sequence - record.length) / 2
             record.sequence_start = record.sequence_start + shift
             record.sequence_end = record.sequence_end + shift
-            for sequence in record.cds:
-                sequence.start = sequence.start + shift
-                sequence.end = sequence.end + shift
+            # The shift can be fractional, so new float arrays are made.
+            record.cds_starts = record.cds_starts + shift
+            record.cds_ends = record.cds_ends + shift
 
     def adjust_positions_alignments_center(self) -> None:
         """Adjust position of alignmets to the center."""
         for alignment in self.alignments:
             shift_q = (self.size_longest_sequence - alignment.query_len) / 2
             shift_h = (self.size_longest_sequence - alignment.hit_len) / 2
-            for region in alignment.regions:
-                region.query_from = region.query_from + shift_q
-                region.query_to = region.query_to + shift_q
-                region.hit_from = region.hit_from + shift_h
-                region.hit_to = region.hit_to + shift_h
+            # The shifts can be fractional, so new float arrays are made.
+            alignment.query_from = alignment.query_from + shift_q
+            alignment.query_to = alignment.query_to + shift_q
+            alignment.hit_from = alignment.hit_from + shift_h
+            alignment.hit_to = alignment.hit_to + shift_h
 
     def plot_dna_sequences(self, ax: Axes) -> None:
         """Plot lines that represent DNA sequences."""
-        y_distance = len(self.gb_records) * self.y_separation
-        # Readjust position sequences to the right or center if requested.
-        if self.alignments_position == "right":
-            self.adjust_positions_sequences_right()
-        elif self.alignments_position == 'center':
-            self.adjust_positions_sequences_center()
-        # Plot lines representing sequences.
-        for gb_record in self.gb_records:
-            x1 = gb_record.sequence_start
-            x2 = gb_record.sequence_end
-            x_values = np.array([x1, x2])
-            y_values = np.array([y_distance, y_distance])
-            ax.plot(
-                x_values,
-                y_values,
-                linestyle='solid',
-                color='black',
-                linewidth=2,
-                zorder=1
-            )
-            y_distance -= self.y_separation
+        # Plot lines representing sequences in a single collection. The
+        # projecting caps are the ones of the lines made by `ax.plot`.
+        segments = np.empty((len(self.gb_records), 2, 2))
+        segments[:, 0, 0] = [
+            gb_record.sequence_start for gb_record in self.gb_records
+        ]
+        segments[:, 1, 0] = [
+            gb_record.sequence_end for gb_record in self.gb_records
+        ]
+        segments[:, :, 1] = self._y_records[:, np.newaxis]
+        ax.add_collection(LineCollection(
+            segments,
+            linestyle='solid',
+            colors='black',
+            linewidths=2,
+            capstyle='projecting',
+            zorder=1
+        ))
+        ax.autoscale_view()
 
     def draw_scale_bar(self, ax: Axes, bar_position: int = 0) -> None:
         """Draw a horizontal scale bar for DNA length."""
@@ -602,42 +876,49 @@ class MakeFigure:
 
     def plot_homology_regions(self, ax: Axes) -> None:
         """Plot homology regions of aligned sequences."""
-        y_distance = ((len(self.alignments) + 1) * self.y_separation)
-        # Readjust position of alignment to right or center if requested.
-        if self.alignments_position == "right":
-            self.adjust_positions_alignments_right()
-        elif self.alignments_position == "center":
-            self.adjust_positions_alignments_center()
-        # Plot regions with homology.
-        for alignment in self.alignments:
-            for region in alignment.regions:
-                # Get region's coordinates.
-                x1 = region.query_from
-                x2 = region.query_to
-                x3 = region.hit_to
-                x4 = region.hit_from
-                y1 = y_distance - self.homology_padding
-                y2 = y_distance - self.homology_padding
-                y3 = y_distance - self.y_separation + self.homology_padding
-                y4 = y_distance - self.y_separation + self.homology_padding
-                xpoints = np.array([x1, x2, x3, x4, x1])
-                ypoints = np.array([y1, y2, y3, y4, y1])
-                ax.plot(xpoints, ypoints, linewidth=0)
-                ax.fill(
-                    xpoints,
-                    ypoints,
-                    facecolor=self.color_map(region.homology),
-                    linewidth=0
-                )
-            y_distance -= self.y_separation
+        # A single sequence has no alignments to plot.
+        if not self.alignments:
+            return
+        # Collect the coordinates and homologies of all the regions.
+        vertices = []
+        homologies = []
+        for i, alignment in enumerate(self.alignments):
+            y_distance = self._y_alignments[i]
+            # Get regions' coordinates.
+            region_vertices = np.empty(
+                (alignment.num_regions, 4, 2), dtype=np.float32
+            )
+            region_vertices[:, 0, 0] = alignment.query_from
+            region_vertices[:, 1, 0] = alignment.query_to
+            region_vertices[:, 2, 0] = alignment.hit_to
+            region_vertices[:, 3, 0] = alignment.hit_from
+            region_vertices[:, :2, 1] = y_distance - self.homology_padding
+            region_vertices[:, 2:, 1] = (
+                y_distance - self.y_separation + self.homology_padding
+            )
+            vertices.append(region_vertices)
+            homologies.append(alignment.homologies)
+        vertices = np.concatenate(vertices)
+        # float32 is enough to pick the bin of the color map.
+        homologies = np.concatenate(homologies, dtype=np.float32)
+        # Get the colors of the regions from the lookup table of the color
+        # map. The homologies, from 0 to 1, are binned as the color map does.
+        num_colors = len(self._cmap_lut)
+        indexes = np.minimum(
+            (homologies * num_colors).astype(np.intp), num_colors - 1
+        )
+        # Plot regions with homology in a single collection.
+        ax.add_collection(PolyCollection(
+            vertices,
+            facecolors=self._cmap_lut.take(indexes, axis=0),
+            linewidths=0,
+            zorder=1
+        ))
+        ax.autoscale_view()
 
     def draw_colorbar(self, fig, ax: Axes) -> None:
         """Draw color bar for homology regions."""
         norm = mpl.colors.Normalize(vmin=0, vmax=100)
-        print(
-            "lowest and highest plot colorbar:",
-            self.lowest_homology, self.highest_homology
-        )
         # if self.lowest_homology != self.highest_homology:
         #     boundaries = np.linspace(
         #         self.lowest_homology, self.highest_homology, 100
@@ -721,13 +1002,12 @@ class MakeFigure:
 
     def plot_genes(self, ax: Axes) -> None:
         """Plot genes."""
-        # Separation of genes of each sequence in the y axis.
-        y_distance = len(self.gb_records) * self.y_separation
         arrowstyle = mpatches.ArrowStyle(
             "simple", head_width=0.5, head_length=0.2
         )
         # Iterate over GenBankRecords and plot genes.
-        for gb_record in self.gb_records:
+        for i, gb_record in enumerate(self.gb_records):
+            y_distance = self._y_records[i]
             for gene in gb_record.cds:
                 arrow = mpatches.FancyArrowPatch(
                     (gene.start, y_distance),
@@ -738,52 +1018,59 @@ class MakeFigure:
                     zorder=2
                 )
                 ax.add_patch(arrow)
-            y_distance -= self.y_separation
 
     def plot_arrows(self, ax: Axes) -> None:
         """Plot arrows to reprent genes."""
-        # Separation of genes of each sequence in the y axis.
-        y_distance = len(self.gb_records) * self.y_separation
         # Ratio head_height vs lenght of longest sequence.
         ratio = 0.02
         head_height = self.size_longest_sequence * ratio
-        # Iterate over GenBankRecords and plot genes.
-        for gb_record in self.gb_records:
-            for gene in gb_record.cds:
-                arrow = Arrow(
-                    x1=gene.start,
-                    x2=gene.end,
-                    y=y_distance,
-                    head_height=head_height
-                )
-                x_values, y_values = arrow.get_coordinates()
-                ax.fill(x_values, y_values, gene.color)
-            y_distance -= self.y_separation
+        # Collect the positions and colors of all the genes.
+        num_cds = [gb_record.num_cds for gb_record in self.gb_records]
+        y_values = np.repeat(self._y_records, num_cds)
+        starts = np.concatenate(
+            [gb_record.cds_starts for gb_record in self.gb_records]
+        )
+        ends = np.concatenate(
+            [gb_record.cds_ends for gb_record in self.gb_records]
+        )
+        gene_colors = np.concatenate(
+            [gb_record.cds_colors for gb_record in self.gb_records]
+        )
+        # Workspace with the (2, 9) coordinates of all the arrows.
+        coordinates = np.empty((len(starts), 2, 9), dtype=np.float32)
+        Arrow.coordinates_batch(
+            x1=starts,
+            x2=ends,
+            y=y_values,
+            head_height=head_height,
+            out=coordinates
+        )
+        # Plot arrows in a single collection of (x, y) vertices.
+        ax.add_collection(PolyCollection(
+            coordinates.transpose(0, 2, 1),
+            facecolors=gene_colors,
+            edgecolors='none',
+            zorder=1
+        ))
+        ax.autoscale_view()
 
     def annotate_dna_sequences(self, ax: Axes) -> None:
         """Annotate DNA sequences."""
-        # Separation of annotations of each sequence in the y axis.
-        y_distance = len(self.gb_records) * self.y_separation
+        # Check if sequence name is valid and get the GenBankRecord attribute
+        # with the name.
+        attribute = _SEQUENCE_NAME_ATTRIBUTES.get(self.sequence_name)
+        if attribute is None:
+            sys.exit(
+                f'Error: invalid sequence name `{self.sequence_name}` for '
+                'annotating sequences.')
         # Annotate sequences.
-        for gb_record in self.gb_records:
-            # Check if sequence name is valis.
-            if self.sequence_name == 'accession':
-                sequence_name = gb_record.accession
-            elif self.sequence_name == 'name':
-                sequence_name = gb_record.name
-            elif self.sequence_name == 'fname':
-                sequence_name = gb_record.file_name
-            else:
-                sys.exit(
-                    f'Error: invalid sequence name `{sequence_name}` for '
-                    'annotating sequences.')
+        for gb_record, y_distance in zip(self.gb_records, self._y_records):
             ax.annotate(
-                sequence_name,
+                getattr(gb_record, attribute),
                 xy=(gb_record.sequence_end, y_distance),
                 xytext=(10, -4),
                 textcoords="offset points"
             )
-            y_distance -= self.y_separation
 
     def annotate_gene_sequences(self, ax: Axes) -> None:
         """Annotate genes of DNA sequence.
@@ -804,14 +1091,14 @@ class MakeFigure:
             "h_alignment": 'left',
             "v_alignment": 'bottom',
             "gb_record": self.gb_records[0],
-            "y_distance": self.y_separation * len(self.gb_records)
+            "y_distance": self._y_records[0]
         }
         bottom = {
             "y_text": -13,
             "h_alignment": 'right',
             "v_alignment": 'top',
             "gb_record": self.gb_records[len(self.gb_records) - 1],
-            "y_distance": self.y_separation
+            "y_distance": self._y_records[-1]
         }
         for position in self.annotate_genes_on_sequence:
             if position == 'top':
@@ -942,10 +1229,12 @@ def app_cli(user_input) -> None:
     """
     # Get list of input files' paths.
     gb_files = user_input.input_files
+    # Make output path for temporary files.
+    path_tmp_files = resources.files(msp) / "tmp_files"
     # Create fasta files for BLASTing.
-    faa_files = make_fasta_files(gb_files)
+    faa_files = make_fasta_files(gb_files, path_tmp_files)
     # Run blastn locally.
-    xml_results = run_blastn(faa_files)
+    xml_results = run_blastn(faa_files, path_tmp_files)
     # Delete fasta files used for BLASTing.
     delete_files(faa_files)
     # Make a list of `BlastnAlignment` classes from the xml blastn results.